@@ -1,10 +1,14 @@
 import json
+import sys
 from collections import defaultdict
 from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from src.utils.artifact_io import write_records
 
 # === File Paths ===
 INPUT_PATH = Path("data/raw/luxury_beauty_reviews.json")
-OUTPUT_PATH = Path("data/processed/sample_reviews.json")
+OUTPUT_PATH = Path("data/processed/sample_reviews.ndjson.gz")
 
 def load_reviews(input_path):
     products_reviews = defaultdict(list)
@@ -33,10 +37,9 @@ def extract_top_products(products_reviews, top_n=9, max_reviews=50):
     return sample_reviews
 
 def save_cleaned_data(data, output_path):
-    output_path.parent.mkdir(parents=True, exist_ok=True)
-    with output_path.open("w") as f:
-        json.dump(data, f, indent=2)
-    print(f"✅ Saved to {output_path}")
+    records = ({"asin": asin, "reviews": reviews} for asin, reviews in data.items())
+    written = write_records(output_path, records)
+    print(f"✅ Saved to {', '.join(str(p) for p in written)}")
 
 def main():
     print("🔍 Loading review data...")
@@ -1,12 +1,17 @@
 import json
+import sys
 from pathlib import Path
 from textblob import TextBlob
 from collections import Counter
 import re
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from src.utils.artifact_io import artifact_exists, read_records, write_records
 
 # Input & output paths
-INPUT_PATH = Path("data/processed/sample_reviews.json")
-OUTPUT_PATH = Path("backend/processed_product_insights.json")
+INPUT_PATH = Path("data/processed/sample_reviews.ndjson.gz")
+LEGACY_INPUT_PATH = Path("data/processed/sample_reviews.json")
+OUTPUT_PATH = Path("backend/processed_product_insights.ndjson.gz")
 
 def clean_text(text):
     return re.sub(r"[^a-zA-Z0-9\s]", "", text.lower())
@@ -48,22 +53,25 @@ def analyze_reviews(reviews):
         "top_keywords": top_keywords
     }
 
-def process_all_products():
-    with INPUT_PATH.open("r") as f:
-        product_data = json.load(f)
+def load_product_reviews():
+    # Fall back to the old pretty-printed {asin: [reviews]} file if it's all we have
+    if not artifact_exists(INPUT_PATH) and LEGACY_INPUT_PATH.exists():
+        with LEGACY_INPUT_PATH.open("r") as f:
+            yield from json.load(f).items()
+        return
 
-    result = []
-    for asin, reviews in product_data.items():
-        insights = analyze_reviews(reviews)
-        result.append({
-            "asin": asin,
-            **insights
-        })
+    for record in read_records(INPUT_PATH):
+        yield record["asin"], record["reviews"]
 
-    with OUTPUT_PATH.open("w") as f:
-        json.dump(result, f, indent=2)
 
-    print(f"✅ NLP output saved to {OUTPUT_PATH}")
+def process_all_products():
+    insights = (
+        {"asin": asin, **analyze_reviews(reviews)}
+        for asin, reviews in load_product_reviews()
+    )
+    written = write_records(OUTPUT_PATH, insights)
+
+    print(f"✅ NLP output saved to {', '.join(str(p) for p in written)}")
 
 if __name__ == "__main__":
     process_all_products()
\ No newline at end of file
@@ -0,0 +1,158 @@
+import json
+import os
+import sys
+from pathlib import Path
+from typing import List, Optional, Union
+
+import pandas as pd
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+
+from src.analytics.text_insights import add_sentiment_scores
+
+DIMENSIONS = ['asin', 'review_month_year', 'overall', 'verified']
+MEASURES = ['row_count', 'review_count', 'rating_sum', 'length_count', 'length_sum',
+            'sentiment_count', 'polarity_sum', 'subjectivity_sum']
+
+FilterValue = Union[str, float, bool, List]
+
+
+class SentimentCube:
+    """
+    Pre-aggregated ASIN × month × star rating × verified cube.
+
+    Only non-empty cells are stored, and every dimension is a pandas
+    Categorical, so each cell is a handful of small integer codes plus the
+    additive measures in MEASURES. Averages are always derived from sums and
+    counts at query time, which keeps roll-ups exact.
+
+    Missing values are kept as their own cells and, like pandas mean(), left
+    out of each average's denominator: avg_verified only counts rows whose
+    `verified` is known. Float sums are added in a different order than a
+    row-level pandas mean, so avg_polarity/avg_subjectivity can differ from
+    it by about 1e-16 (one ULP).
+    """
+
+    def __init__(self, cells: pd.DataFrame):
+        self.cells = cells
+
+    def query(self, by: Optional[List[str]] = None, **filters: FilterValue) -> pd.DataFrame:
+        """
+        Slices/dices the cube with `filters` (dimension=value or list of values)
+        and rolls up every dimension not listed in `by`.
+
+        e.g. cube.query(by=['review_month_year'], asin='B001MF3FMW', verified=True)
+        """
+        by = by or []
+        for dim in list(filters) + by:
+            if dim not in DIMENSIONS:
+                raise ValueError(f"Unknown dimension '{dim}', expected one of {DIMENSIONS}")
+
+        mask = pd.Series(True, index=self.cells.index)
+        for dim, value in filters.items():
+            values = value if isinstance(value, (list, tuple, set)) else [value]
+            mask &= self.cells[dim].isin(values)
+        selected = self.cells[mask]
+
+        # `verified` is True/False/missing; only known values count towards avg_verified
+        selected = selected.assign(
+            verified_count=selected['row_count'].where(selected['verified'].isin([True]), 0),
+            verified_present=selected['row_count'].where(selected['verified'].notna(), 0),
+        )
+        measures = MEASURES + ['verified_count', 'verified_present']
+
+        if by:
+            totals = selected.groupby(by, observed=True, dropna=False)[measures].sum()
+        else:
+            totals = selected[measures].sum().to_frame().T
+
+        result = pd.DataFrame(index=totals.index)
+        result['review_count'] = totals['review_count'].astype(int)
+        result['avg_rating'] = totals['rating_sum'] / totals['review_count']
+        result['avg_verified'] = totals['verified_count'] / totals['verified_present']
+        result['avg_length'] = totals['length_sum'] / totals['length_count']
+        result['avg_polarity'] = totals['polarity_sum'] / totals['sentiment_count']
+        result['avg_subjectivity'] = totals['subjectivity_sum'] / totals['sentiment_count']
+
+        return result.reset_index() if by else result.reset_index(drop=True)
+
+    def members(self, dim: str) -> List:
+        """Lists the values present along one dimension."""
+        return list(self.cells[dim].cat.categories)
+
+    def save(self, output_path: Path):
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        self.cells.to_parquet(output_path, index=False)
+        print(f"✅ Cube with {len(self.cells)} cells saved to {output_path}")
+
+    @classmethod
+    def load(cls, input_path: Path) -> "SentimentCube":
+        cells = pd.read_parquet(input_path)
+        for dim in DIMENSIONS:
+            cells[dim] = cells[dim].astype('category')
+        return cls(cells)
+
+
+def build_cube(df: pd.DataFrame) -> SentimentCube:
+    """
+    Aggregates a review DataFrame (asin, reviewTime, overall, verified,
+    reviewText) into a SentimentCube. Sentiment and length columns are
+    computed the same way as the pandas path if they are missing. Rows with
+    a missing dimension value (e.g. unknown `verified`) get their own cells.
+    """
+    df = df.copy()
+    df['review_month_year'] = df['reviewTime'].dt.to_period('M').astype(str)
+
+    if 'reviewLength' not in df:
+        df['reviewLength'] = df['reviewText'].apply(lambda x: len(x.split()) if isinstance(x, str) else 0)
+    if 'polarity' not in df or 'subjectivity' not in df:
+        df = add_sentiment_scores(df)
+
+    df['sentiment_present'] = df['polarity'].notna().astype(int)
+
+    cells = (
+        df.groupby(DIMENSIONS, observed=True, dropna=False)
+        .agg(
+            row_count=('asin', 'size'),
+            review_count=('overall', 'count'),
+            rating_sum=('overall', 'sum'),
+            length_count=('reviewLength', 'count'),
+            length_sum=('reviewLength', 'sum'),
+            sentiment_count=('sentiment_present', 'sum'),
+            polarity_sum=('polarity', 'sum'),
+            subjectivity_sum=('subjectivity', 'sum'),
+        )
+        .reset_index()
+    )
+    for dim in DIMENSIONS:
+        cells[dim] = cells[dim].astype('category')
+
+    print(f"🧊 Built cube: {len(cells)} non-empty cells from {len(df)} reviews")
+    return SentimentCube(cells)
+
+
+if __name__ == "__main__":
+    print("📁 Loading sample data...")
+
+    file_path = os.path.join("data", "raw", "luxury_beauty_reviews.json")
+    cleaned_data = []
+    with open(file_path, "r") as f:
+        for i, line in enumerate(f):
+            try:
+                cleaned_data.append(json.loads(line))
+            except json.JSONDecodeError as e:
+                print(f"⚠️ Skipping malformed line {i}: {e}")
+
+    df = pd.DataFrame(cleaned_data)
+    df['reviewTime'] = pd.to_datetime(df['reviewTime'], errors='coerce')
+
+    cube = build_cube(df)
+    cube.save(Path("data/processed/sentiment_cube.parquet"))
+
+    sample_asin = cube.members('asin')[0]
+    print(f"\n📆 Monthly sentiment for {sample_asin} (verified only):")
+    print(cube.query(by=['review_month_year'], asin=sample_asin, verified=True).head())
+
+    sample_month = cube.members('review_month_year')[-1]
+    print(f"\n⭐ Review count by rating for {sample_month}:")
+    print(cube.query(by=['overall'], review_month_year=sample_month)[['overall', 'review_count']])
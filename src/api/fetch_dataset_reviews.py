@@ -9,7 +9,7 @@ from src.nlp.sentiment import analyze_sentiment
 def load_reviews_from_dataset(filepath: str, max_reviews: int = 10) -> list:
     """
     Load and parse reviews from the Luxury Beauty dataset.
-    Returns a list of reviews: user, rating, comment
+    Returns a list of reviews: user, asin, rating, comment
     """
     reviews = []
     try:
@@ -18,6 +18,7 @@ def load_reviews_from_dataset(filepath: str, max_reviews: int = 10) -> list:
                 data = json.loads(line)
                 review = {
                     "user": data.get("reviewerID", "unknown_user"),
+                    "asin": data.get("asin", ""),
                     "rating": data.get("overall", None),
                     "comment": data.get("reviewText", "")
                 }
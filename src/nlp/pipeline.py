@@ -0,0 +1,227 @@
+import os
+import queue
+import sys
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+
+from src.nlp.review_parser import iter_reviews_from_json
+from src.nlp.sentence_sentiment import analyze_sentences
+
+_DONE = object()  # End-of-stream marker passed between stages
+_POLL_SECONDS = 0.1
+
+
+class PipelineStopped(Exception):
+    """Raised inside a stage when another stage has already failed."""
+
+
+def _put(q: queue.Queue, item: Any, stop: threading.Event):
+    # Blocking put that gives up once the pipeline is shutting down,
+    # so a failed consumer can never leave a producer stuck on a full queue
+    while True:
+        if stop.is_set():
+            raise PipelineStopped()
+        try:
+            q.put(item, timeout=_POLL_SECONDS)
+            return
+        except queue.Full:
+            continue
+
+
+def _get(q: queue.Queue, stop: threading.Event) -> Any:
+    while True:
+        if stop.is_set():
+            raise PipelineStopped()
+        try:
+            return q.get(timeout=_POLL_SECONDS)
+        except queue.Empty:
+            continue
+
+
+def _batched(reviews: Iterable[Dict], batch_size: int) -> Iterator[List[Dict]]:
+    batch = []
+    for review in reviews:
+        batch.append(review)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def score_batch(reviews: List[Dict]) -> List[Dict]:
+    """
+    Scores a batch of reviews the same way aggregate_product_sentiment does.
+    Runs inside the worker pool, so it only returns the fields aggregation needs.
+    """
+    scored = []
+    for review in reviews:
+        text = review.get("reviewText", "")
+        if not text:
+            continue
+        summary = analyze_sentences(text)["summary"]
+        scored.append({
+            "asin": review.get("asin", "").strip() or None,
+            "reviewerID": review.get("reviewerID"),
+            "polarity": summary["avg_polarity"],
+            "subjectivity": summary["avg_subjectivity"],
+        })
+    return scored
+
+
+class SentimentAccumulator:
+    """
+    Running per-key sentiment sums, producing the same records as
+    aggregate_by_product / aggregate_by_reviewer.
+    """
+
+    def __init__(self, key: str):
+        self.key = key
+        self.totals = defaultdict(lambda: [0.0, 0.0, 0])
+
+    def add(self, scored: Dict):
+        key = scored[self.key]
+        if key is None:
+            return
+        totals = self.totals[key]
+        totals[0] += scored["polarity"]
+        totals[1] += scored["subjectivity"]
+        totals[2] += 1
+
+    def results(self) -> List[Dict]:
+        return [
+            {
+                self.key: key,
+                "avg_polarity": round(polarity / count, 4),
+                "avg_subjectivity": round(subjectivity / count, 4),
+                "review_count": count,
+            }
+            for key, (polarity, subjectivity, count) in self.totals.items()
+        ]
+
+
+def run_pipeline(file_path: str, workers: int = None, batch_size: int = 256,
+                 queue_size: int = 8, use_processes: bool = True) -> Tuple[List[Dict], List[Dict]]:
+    """
+    Streams reviews from `file_path` through three overlapped stages:
+
+        reader thread -> [batches] -> scoring pool -> [scored] -> aggregator thread
+
+    Queues are bounded and at most `workers + queue_size` batches are in the
+    pool at once (one per worker plus `queue_size` waiting), so every worker
+    stays busy while a slow stage still applies backpressure instead of
+    buffering the corpus.
+    Scored batches are aggregated in file order, so sums and record order
+    are identical to aggregate_by_product / aggregate_by_reviewer.
+    If any stage fails, the others are stopped and the error is re-raised.
+    Returns (product_results, reviewer_results).
+    """
+    workers = workers or os.cpu_count() or 1
+    batches = queue.Queue(maxsize=queue_size)
+    scored = queue.Queue(maxsize=queue_size)
+    stop = threading.Event()
+    errors = []
+
+    by_product = SentimentAccumulator("asin")
+    by_reviewer = SentimentAccumulator("reviewerID")
+    stats = defaultdict(int)
+
+    def fail(error: BaseException):
+        if not isinstance(error, PipelineStopped):
+            errors.append(error)
+        stop.set()
+
+    def reader():
+        try:
+            for batch in _batched(iter_reviews_from_json(file_path), batch_size):
+                stats["read"] += len(batch)
+                _put(batches, batch, stop)
+            _put(batches, _DONE, stop)
+        except BaseException as e:
+            fail(e)
+
+    def aggregator():
+        try:
+            while True:
+                results = _get(scored, stop)
+                if results is _DONE:
+                    return
+                for result in results:
+                    by_product.add(result)
+                    by_reviewer.add(result)
+                stats["scored"] += len(results)
+        except BaseException as e:
+            fail(e)
+
+    start_time = time.perf_counter()
+    # Start the pool (and, with processes, fork its workers) before any
+    # other thread exists; forking a multi-threaded process can deadlock
+    if use_processes:
+        pool = ProcessPoolExecutor(max_workers=workers)
+        for _ in pool.map(int, range(workers)):
+            pass
+    else:
+        pool = ThreadPoolExecutor(max_workers=workers)
+
+    threads = [
+        threading.Thread(target=reader, name="review-reader", daemon=True),
+        threading.Thread(target=aggregator, name="sentiment-aggregator", daemon=True),
+    ]
+    for thread in threads:
+        thread.start()
+
+    # Futures are forwarded oldest-first so aggregation order never depends on timing
+    in_flight = deque()
+
+    def forward_oldest():
+        _put(scored, in_flight.popleft().result(), stop)
+
+    try:
+        while True:
+            batch = _get(batches, stop)
+            if batch is _DONE:
+                break
+            in_flight.append(pool.submit(score_batch, batch))
+            if len(in_flight) >= workers + queue_size:
+                forward_oldest()
+
+        while in_flight:
+            forward_oldest()
+        _put(scored, _DONE, stop)
+    except BaseException as e:
+        fail(e)
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+        for thread in threads:
+            thread.join()
+
+    if errors:
+        raise errors[0]
+
+    elapsed = time.perf_counter() - start_time
+    print(f"⚙️ Pipeline scored {stats['scored']}/{stats['read']} reviews "
+          f"with {workers} workers in {elapsed:.1f}s")
+
+    return by_product.results(), by_reviewer.results()
+
+
+if __name__ == "__main__":
+    BASE_DIR = Path(__file__).resolve().parents[2]
+    file_path = os.path.join(BASE_DIR, 'data', 'raw', 'luxury_beauty_reviews.json')
+
+    product_results, reviewer_results = run_pipeline(file_path)
+    print(f"📊 Found {len(product_results)} unique products")
+
+    print("\n📦 Top 5 Products:")
+    for r in product_results[:5]:
+        print(r)
+
+    print("\n👤 Top 5 Reviewers:")
+    for r in reviewer_results[:5]:
+        print(r)
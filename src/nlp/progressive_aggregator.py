@@ -0,0 +1,327 @@
+import math
+import random
+import sys
+from collections import defaultdict
+from pathlib import Path
+from statistics import NormalDist
+from typing import Callable, Dict, Hashable, Iterator, List, Tuple
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+
+from src.nlp.sentence_sentiment import analyze_sentences
+from src.nlp.sentiment import analyze_sentiment
+
+
+# Below this many samples a stratum's own variance is not trusted on its own
+MIN_STRATUM_SAMPLES = 10
+
+
+class RunningStat:
+    """Welford running mean/variance."""
+
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def add(self, value: float):
+        self.n += 1
+        delta = value - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (value - self.mean)
+
+    @property
+    def variance(self) -> float:
+        return self.m2 / (self.n - 1) if self.n > 1 else 0.0
+
+
+class StratifiedMean:
+    """
+    Stratified estimate of a population mean from a growing sample.
+
+    Strata not sampled yet borrow the pooled sample mean and count their
+    pooled variance as if backed by a single observation, so the interval
+    stays conservative until every stratum is represented. Thinly sampled
+    strata never report less than the pooled variance, and no finite margin
+    is given before `min_samples` values, so a run of identical early values
+    cannot produce a zero-width interval.
+    """
+
+    def __init__(self, strata_sizes: Dict[Hashable, int], min_samples: int = 10):
+        self.sizes = strata_sizes
+        self.min_samples = max(2, min_samples)
+        self.total = sum(strata_sizes.values())
+        self.stats = defaultdict(RunningStat)
+        self.pooled = RunningStat()
+
+    def add(self, stratum: Hashable, value: float):
+        self.stats[stratum].add(value)
+        self.pooled.add(value)
+
+    def estimate(self, z: float) -> Tuple[float, float]:
+        """Returns (mean, confidence half-width)."""
+        if self.pooled.n == self.total:
+            return self.pooled.mean, 0.0
+        if self.pooled.n < self.min_samples:
+            return self.pooled.mean, math.inf
+
+        pooled_var = self.pooled.variance
+        mean = 0.0
+        var = 0.0
+        for stratum, size in self.sizes.items():
+            weight = size / self.total
+            stat = self.stats.get(stratum)
+            if stat is None or stat.n == 0:
+                mean += weight * self.pooled.mean
+                var += weight * weight * pooled_var
+                continue
+            s2 = stat.variance if stat.n >= MIN_STRATUM_SAMPLES else max(stat.variance, pooled_var)
+            mean += weight * stat.mean
+            var += weight * weight * (1 - stat.n / size) * s2 / stat.n
+
+        return mean, z * math.sqrt(var)
+
+
+def _z_score(confidence: float) -> float:
+    return NormalDist().inv_cdf(0.5 + confidence / 2)
+
+
+def _wilson_interval(share: float, n: int, population: int, z: float) -> Tuple[float, float]:
+    if n == population:
+        return share, share
+    z2 = z * z
+    denom = 1 + z2 / n
+    center = (share + z2 / (2 * n)) / denom
+    half = z * math.sqrt(share * (1 - share) / n + z2 / (4 * n * n)) / denom
+    half *= math.sqrt(1 - n / population)
+    return max(0.0, center - half), min(1.0, center + half)
+
+
+def _rating_stratum(review: Dict) -> Tuple:
+    return review.get("asin", ""), review.get("overall", review.get("rating"))
+
+
+def stratified_order(reviews: List[Dict], stratum_of: Callable[[Dict], Hashable] = _rating_stratum,
+                     seed: int = 42) -> List[int]:
+    """
+    Returns review indices in a random order where every prefix is a
+    proportional stratified sample (by ASIN and star rating by default).
+    """
+    strata = defaultdict(list)
+    for i, review in enumerate(reviews):
+        strata[stratum_of(review)].append(i)
+
+    rng = random.Random(seed)
+    keyed = []
+    for members in strata.values():
+        rng.shuffle(members)
+        offset = rng.random()
+        for rank, i in enumerate(members):
+            keyed.append(((rank + offset) / len(members), i))
+
+    keyed.sort()
+    return [i for _, i in keyed]
+
+
+def progressive_summarize_sentiments(reviews: List[Dict], error_bound: float = 0.01,
+                                     confidence: float = 0.95, batch_size: int = 200,
+                                     min_samples: int = 100, seed: int = 42) -> Iterator[Dict]:
+    """
+    Progressive version of summarize_sentiments. Yields a refined estimate
+    after each batch and stops once both margins are within `error_bound`
+    (never before `min_samples` reviews).
+
+    Reviews from load_reviews_from_dataset carry `asin` and `rating`, so the
+    sample is stratified by ASIN x star rating like the other progressive
+    aggregators.
+    """
+    z = _z_score(confidence)
+    sizes = defaultdict(int)
+    for review in reviews:
+        sizes[_rating_stratum(review)] += 1
+
+    polarity = StratifiedMean(sizes, min_samples)
+    subjectivity = StratifiedMean(sizes, min_samples)
+    most_positive = most_negative = None
+    order = stratified_order(reviews, seed=seed)
+
+    for start in range(0, len(order), batch_size):
+        for i in order[start:start + batch_size]:
+            review = reviews[i]
+            sentiment = analyze_sentiment(review["comment"])
+            stratum = _rating_stratum(review)
+            polarity.add(stratum, sentiment["polarity"])
+            subjectivity.add(stratum, sentiment["subjectivity"])
+
+            if most_positive is None or sentiment["polarity"] > most_positive[1]:
+                most_positive = (review, sentiment["polarity"])
+            if most_negative is None or sentiment["polarity"] < most_negative[1]:
+                most_negative = (review, sentiment["polarity"])
+
+        avg_polarity, polarity_margin = polarity.estimate(z)
+        avg_subjectivity, subjectivity_margin = subjectivity.estimate(z)
+        done = max(polarity_margin, subjectivity_margin) <= error_bound
+
+        yield {
+            "processed": polarity.pooled.n,
+            "total": len(reviews),
+            "average_polarity": round(avg_polarity, 3),
+            "polarity_margin": round(polarity_margin, 4),
+            "average_subjectivity": round(avg_subjectivity, 3),
+            "subjectivity_margin": round(subjectivity_margin, 4),
+            "most_positive": most_positive[0],
+            "most_negative": most_negative[0],
+            "done": done or polarity.pooled.n == len(reviews),
+        }
+        if done:
+            return
+
+
+def progressive_aggregate_by_product(reviews: List[Dict], error_bound: float = 0.05,
+                                     confidence: float = 0.95, batch_size: int = 1000,
+                                     min_reviews: int = 20, min_samples: int = 10,
+                                     seed: int = 42) -> Iterator[Dict]:
+    """
+    Progressive version of aggregate_by_product. Yields per-ASIN estimates with
+    margins after each batch and stops once every ASIN with at least
+    `min_reviews` reviews is within `error_bound`. Smaller ASINs are reported
+    as they are sampled but never hold up the stop. Each ASIN needs at least
+    `min_samples` scored reviews (or all of them) before its margin is finite.
+    """
+    z = _z_score(confidence)
+    reviews = [r for r in reviews if r.get("asin", "").strip() and r.get("reviewText")]
+
+    sizes = defaultdict(lambda: defaultdict(int))
+    for review in reviews:
+        asin, rating = _rating_stratum(review)
+        sizes[asin][rating] += 1
+
+    polarity = {asin: StratifiedMean(strata, min_samples) for asin, strata in sizes.items()}
+    subjectivity = {asin: StratifiedMean(strata, min_samples) for asin, strata in sizes.items()}
+    tracked = {asin for asin, est in polarity.items() if est.total >= min_reviews}
+    estimates = {}
+    order = stratified_order(reviews, seed=seed)
+
+    for start in range(0, len(order), batch_size):
+        touched = set()
+        for i in order[start:start + batch_size]:
+            review = reviews[i]
+            asin, rating = _rating_stratum(review)
+            summary = analyze_sentences(review["reviewText"])["summary"]
+            polarity[asin].add(rating, summary["avg_polarity"])
+            subjectivity[asin].add(rating, summary["avg_subjectivity"])
+            touched.add(asin)
+
+        # Only re-estimate products that received new samples in this batch
+        for asin in touched:
+            avg_polarity, polarity_margin = polarity[asin].estimate(z)
+            avg_subjectivity, subjectivity_margin = subjectivity[asin].estimate(z)
+            estimates[asin] = {
+                "asin": asin,
+                "avg_polarity": round(avg_polarity, 4),
+                "avg_subjectivity": round(avg_subjectivity, 4),
+                "review_count": polarity[asin].total,
+                "sampled": polarity[asin].pooled.n,
+                "polarity_margin": round(polarity_margin, 4),
+                "subjectivity_margin": round(subjectivity_margin, 4),
+            }
+
+        processed = min(start + batch_size, len(order))
+        done = all(
+            asin in estimates
+            and max(estimates[asin]["polarity_margin"], estimates[asin]["subjectivity_margin"]) <= error_bound
+            for asin in tracked
+        )
+
+        yield {
+            "processed": processed,
+            "total": len(reviews),
+            "products": list(estimates.values()),
+            "done": done or processed == len(reviews),
+        }
+        if done:
+            return
+
+
+def progressive_reviewer_segmentation(reviews: List[Dict], divergence_threshold: float = 1.0,
+                                      error_bound: float = 0.01, confidence: float = 0.95,
+                                      batch_size: int = 1000, min_samples: int = 100,
+                                      seed: int = 42) -> Iterator[Dict]:
+    """
+    Progressive version of reviewer_segmentation. Product averages are exact
+    (ratings only), while reviewers are classified in random order and the
+    share of divergent reviewers gets a Wilson interval with a finite-population
+    correction, which stays honest when the sampled share is 0 or 1. Each
+    snapshot carries its own copy of the segments classified so far.
+    """
+    z = _z_score(confidence)
+    rating_totals = defaultdict(lambda: [0.0, 0])
+    by_reviewer = defaultdict(list)
+    for review in reviews:
+        totals = rating_totals[review["asin"]]
+        totals[0] += review["overall"]
+        totals[1] += 1
+        by_reviewer[review["reviewerID"]].append(review)
+    product_avg = {asin: total / count for asin, (total, count) in rating_totals.items()}
+
+    reviewer_ids = list(by_reviewer)
+    random.Random(seed).shuffle(reviewer_ids)
+    population = len(reviewer_ids)
+    segments = []
+    divergent = 0
+
+    for start in range(0, population, batch_size):
+        for reviewer_id in reviewer_ids[start:start + batch_size]:
+            own = by_reviewer[reviewer_id]
+            diff = sum(r["overall"] - product_avg[r["asin"]] for r in own) / len(own)
+            classification = 'divergent' if abs(diff) > divergence_threshold else 'aligned'
+            divergent += classification == 'divergent'
+            segments.append({
+                "reviewerID": reviewer_id,
+                "avg_rating_diff": diff,
+                "classification": classification,
+            })
+
+        n = len(segments)
+        share = divergent / n
+        lower, upper = _wilson_interval(share, n, population, z)
+        margin = (upper - lower) / 2
+        done = n >= min(min_samples, population) and margin <= error_bound
+
+        yield {
+            "processed": n,
+            "total": population,
+            "divergent_share": round(share, 4),
+            "interval": (round(lower, 4), round(upper, 4)),
+            "margin": round(margin, 4),
+            "segments": list(segments),
+            "done": done or n == population,
+        }
+        if done:
+            return
+
+
+if __name__ == "__main__":
+    import os
+    import time
+    from src.nlp.review_parser import load_reviews_from_json
+
+    BASE_DIR = Path(__file__).resolve().parents[2]
+    file_path = os.path.join(BASE_DIR, 'data', 'raw', 'luxury_beauty_reviews.json')
+
+    all_reviews = load_reviews_from_json(file_path)
+    print(f"📁 Loaded {len(all_reviews)} reviews")
+
+    start_time = time.perf_counter()
+    for snapshot in progressive_aggregate_by_product(all_reviews, error_bound=0.05):
+        tracked = [p for p in snapshot["products"] if p["review_count"] >= 20]
+        worst = max((p["polarity_margin"] for p in tracked), default=math.inf)
+        print(f"⏳ {snapshot['processed']}/{snapshot['total']} reviews | "
+              f"{len(snapshot['products'])} products | worst polarity margin ±{worst} | "
+              f"{time.perf_counter() - start_time:.1f}s")
+        if snapshot["done"]:
+            break
+
+    print("\n📦 Top 5 Products (estimated):")
+    for p in sorted(snapshot["products"], key=lambda p: -p["review_count"])[:5]:
+        print(p)
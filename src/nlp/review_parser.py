@@ -1,5 +1,5 @@
 import json
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterator
 
 
 def load_reviews_from_json(file_path: str) -> List[Dict[str, Any]]:
@@ -7,8 +7,14 @@ def load_reviews_from_json(file_path: str) -> List[Dict[str, Any]]:
     Loads and parses review data from an Amazon line-delimited JSON file.
     Returns a list of cleaned review dictionaries.
     """
-    reviews = []
+    return list(iter_reviews_from_json(file_path))
 
+
+def iter_reviews_from_json(file_path: str) -> Iterator[Dict[str, Any]]:
+    """
+    Streaming version of load_reviews_from_json: yields cleaned review
+    dictionaries one line at a time.
+    """
     with open(file_path, 'r', encoding='utf-8') as f:
         for line in f:
             try:
@@ -21,15 +27,13 @@ def load_reviews_from_json(file_path: str) -> List[Dict[str, Any]]:
                 reviewer_id = data.get("reviewerID", "").strip()
 
                 if review_text and summary and overall and asin:
-                    reviews.append({
+                    yield {
                     "asin": asin,
                     "reviewerID": reviewer_id,
                     "summary": summary,
                     "reviewText": review_text,
                     "overall": overall
-                    })
+                    }
 
             except json.JSONDecodeError:
-                continue  # Skip malformed lines
-
-    return reviews
\ No newline at end of file
+                continue  # Skip malformed lines
\ No newline at end of file
@@ -0,0 +1,404 @@
+import gzip
+import json
+import os
+import re
+import tempfile
+import uuid
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+# Output format and compression are picked from the file suffix:
+#   insights.ndjson / insights.ndjson.gz / insights.ndjson.zst / insights.parquet
+PARQUET_BATCH_SIZE = 1000
+# Parquet schema metadata listing columns stored as JSON strings
+JSON_COLUMNS_KEY = b"artifact_io.json_columns"
+
+
+def _split_suffix(path: Path):
+    """Splits 'dir/name.ndjson.gz' into ('dir/name', '.ndjson.gz')."""
+    name = path.name
+    for suffix in (".ndjson.gz", ".ndjson.zst", ".ndjson", ".parquet"):
+        if name.endswith(suffix):
+            return path.with_name(name[:-len(suffix)]), suffix
+    raise ValueError(f"Unsupported artifact type: {path} (expected .ndjson[.gz|.zst] or .parquet)")
+
+
+def _manifest_path(path: Path) -> Path:
+    return path.with_name(path.name + ".manifest.json")
+
+
+def _shard_files(path: Path) -> List[Path]:
+    """Lists shard files written for `path` by any run, and nothing else."""
+    stem, suffix = _split_suffix(path)
+    # '<name>-<8 hex run id>-<5 digit index><suffix>'; a bare glob would also
+    # match the shards of 'name-2024.ndjson.gz' when cleaning up 'name.ndjson.gz'
+    shard_name = re.compile(rf"{re.escape(stem.name)}-[0-9a-f]{{8}}-\d{{5}}{re.escape(suffix)}")
+    return [p for p in path.parent.iterdir() if shard_name.fullmatch(p.name)]
+
+
+def _open_compressed(path: Path, mode: str):
+    if path.suffix == ".gz":
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    if path.suffix == ".zst":
+        try:
+            import zstandard
+        except ImportError as e:
+            raise ImportError("Writing .zst artifacts requires the 'zstandard' package") from e
+        return zstandard.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+def _write_atomically(path: Path, text: str):
+    fd, tmp = tempfile.mkstemp(prefix=f".{path.name}.", suffix=".tmp", dir=path.parent)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
+
+def _decode_json_columns(row: Dict[str, Any], json_columns) -> Dict[str, Any]:
+    for name in json_columns:
+        if row.get(name) is not None:
+            row[name] = json.loads(row[name])
+    return row
+
+
+class _ParquetSink:
+    """
+    Streams row batches into one Parquet file.
+
+    Without an explicit schema, each batch's schema is inferred and merged
+    into the file's: all-null columns take the first concrete type, numeric
+    types widen, and columns Arrow cannot type (e.g. lists of mixed-type
+    tuples) are stored as JSON strings that read_records decodes. If a merge
+    changes the type of rows already written, the file is rewritten once
+    with the merged schema.
+    """
+
+    def __init__(self, path: Path, compression: str, schema=None):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self.pa, self.pq = pa, pq
+        self.arrow_errors = (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError)
+        self.path = path
+        self.compression = compression
+        self.fixed = schema is not None
+        self.schema = schema
+        self.json_columns = set()
+        self._writer = None
+
+    def _encode(self, name: str, values: List[Any]):
+        if name in self.json_columns:
+            values = [None if v is None else json.dumps(v, ensure_ascii=False) for v in values]
+            return self.pa.array(values, type=self.pa.string())
+        try:
+            return self.pa.array(values)
+        except self.arrow_errors:
+            self.json_columns.add(name)
+            return self._encode(name, values)
+
+    def _infer(self, rows: List[Dict[str, Any]]):
+        names = list(self.schema.names) if self.schema is not None else []
+        seen = set(names)
+        for row in rows:
+            for name in row:
+                if name not in seen:
+                    seen.add(name)
+                    names.append(name)
+        arrays = [self._encode(name, [row.get(name) for row in rows]) for name in names]
+        return self.pa.Table.from_arrays(arrays, names=names)
+
+    def _merge(self, incoming):
+        pa = self.pa
+        if self.schema is None:
+            return incoming
+
+        fields = []
+        for field in self.schema:
+            if field.name in self.json_columns:
+                fields.append(pa.field(field.name, pa.string()))
+            elif field.name not in incoming.names:
+                fields.append(field)
+            else:
+                try:
+                    merged = pa.unify_schemas(
+                        [pa.schema([field]), pa.schema([incoming.field(field.name)])],
+                        promote_options="permissive",
+                    )
+                    fields.append(merged.field(0))
+                except self.arrow_errors:
+                    self.json_columns.add(field.name)
+                    fields.append(pa.field(field.name, pa.string()))
+        fields.extend(f for f in incoming if f.name not in self.schema.names)
+        return pa.schema(fields)
+
+    def _conform(self, table, schema):
+        """Casts `table` to `schema`; returns None after marking any column that won't cast as JSON."""
+        columns = []
+        for field in schema:
+            if field.name in table.column_names:
+                column = table.column(field.name)
+            else:
+                column = self.pa.nulls(len(table), field.type)
+            try:
+                columns.append(column.cast(field.type))
+            except self.arrow_errors:
+                self.json_columns.add(field.name)
+                return None
+        return self.pa.Table.from_arrays(columns, schema=schema)
+
+    def _with_metadata(self, schema):
+        return schema.with_metadata({JSON_COLUMNS_KEY: json.dumps(sorted(self.json_columns))})
+
+    def _open_writer(self, schema):
+        self._writer = self.pq.ParquetWriter(self.path, schema, compression=self.compression)
+
+    def write(self, rows: List[Dict[str, Any]]):
+        if self.fixed:
+            table = self.pa.Table.from_pylist(rows, schema=self.schema)
+            if self._writer is None:
+                self._open_writer(self.schema)
+            self._writer.write_table(table)
+            return
+
+        previous_json = set(self.json_columns)
+        # Each pass either succeeds or marks one more column as JSON
+        while True:
+            marked = set(self.json_columns)
+            table = self._infer(rows)
+            schema = self._merge(table.schema)
+            if self.json_columns != marked:
+                continue
+            table = self._conform(table, schema)
+            if table is not None:
+                break
+        schema = self._with_metadata(schema)
+
+        if self._writer is None:
+            self._open_writer(schema)
+        elif not schema.equals(self.schema, check_metadata=True):
+            self._rewrite(schema, previous_json)
+        self.schema = schema
+        self._writer.write_table(table.replace_schema_metadata(schema.metadata))
+
+    def _rewrite(self, schema, previous_json):
+        self._writer.close()
+        written = self.pq.read_table(self.path).to_pylist()
+        written = [_decode_json_columns(row, previous_json) for row in written]
+
+        table = self._conform(self._infer(written), schema)
+        if table is None:
+            raise ValueError(f"Cannot merge earlier rows of {self.path} into schema {schema}")
+        self._open_writer(schema)
+        self._writer.write_table(table.replace_schema_metadata(schema.metadata))
+
+    def close(self):
+        if self._writer is None:
+            # No rows: still leave a valid (empty) Parquet file behind
+            schema = self.schema if self.schema is not None else self.pa.schema([])
+            self.pq.write_table(schema.empty_table(), self.path, compression=self.compression)
+        else:
+            self._writer.close()
+            self._writer = None
+
+
+class RecordWriter:
+    """
+    Streams dict records to an NDJSON or Parquet artifact.
+
+    Nothing is visible to readers until close() succeeds. A single-file
+    artifact is written to a temp file and renamed over `path`. With
+    `max_bytes` set, records are split into shards of roughly that size (for
+    NDJSON, uncompressed bytes) named `<name>-<run id>-00000<suffix>`, and
+    all shards are published at once by atomically replacing
+    `<path>.manifest.json`. Publishing either form removes the other, along
+    with shards left over from earlier or crashed runs. On error, everything
+    this writer created is deleted and the previous artifact stays intact.
+    Once closed or aborted, further close() calls are no-ops and write() raises.
+    """
+
+    def __init__(self, path: Path, max_bytes: Optional[int] = None, compression: str = "zstd",
+                 schema=None):
+        self.path = Path(path)
+        self._stem, self.suffix = _split_suffix(self.path)
+        self.is_parquet = self.suffix == ".parquet"
+        self.max_bytes = max_bytes
+        self.compression = compression  # Parquet only; NDJSON uses the suffix
+        self.schema = schema            # Parquet only; a pyarrow.Schema
+        self.run_id = uuid.uuid4().hex[:8]
+        self.records = 0
+        self.paths: List[Path] = []
+        self._staged: List[Path] = []
+        self._current: Optional[Path] = None
+        self._handle = None
+        self._written = 0
+        self._batch: List[Dict[str, Any]] = []
+        self._closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def _next_path(self) -> Path:
+        if self.max_bytes:
+            return self._stem.with_name(f"{self._stem.name}-{self.run_id}-{len(self._staged):05d}{self.suffix}")
+        return self._stem.with_name(f".{self._stem.name}-{self.run_id}.tmp{self.suffix}")
+
+    def _open(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._current = self._next_path()
+        self._written = 0
+        if self.is_parquet:
+            self._handle = _ParquetSink(self._current, self.compression, self.schema)
+        else:
+            self._handle = _open_compressed(self._current, "w")
+
+    def _finish_file(self):
+        if self._current is None:
+            return
+        if self.is_parquet:
+            self._flush_batch()
+        self._handle.close()
+        self._staged.append(self._current)
+        self._current, self._handle = None, None
+
+    def _flush_batch(self):
+        if not self._batch:
+            return
+        self._handle.write(self._batch)
+        self._batch = []
+        self._written = self._current.stat().st_size
+
+    def write(self, record: Dict[str, Any]):
+        if self._closed:
+            raise ValueError("RecordWriter is closed")
+        if self._current is None:
+            self._open()
+
+        if self.is_parquet:
+            self._batch.append(record)
+            if len(self._batch) >= PARQUET_BATCH_SIZE:
+                self._flush_batch()
+        else:
+            line = json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n"
+            self._handle.write(line)
+            self._written += len(line.encode("utf-8"))
+        self.records += 1
+
+        if self.max_bytes and self._written >= self.max_bytes:
+            self._finish_file()
+
+    def write_all(self, records: Iterable[Dict[str, Any]]) -> int:
+        count = 0
+        for record in records:
+            self.write(record)
+            count += 1
+        return count
+
+    def close(self) -> List[Path]:
+        if self._closed:
+            return self.paths  # e.g. an explicit close() inside a with block
+        try:
+            if self._current is None and not self._staged and not self.max_bytes:
+                self._open()  # A single-file artifact always exists, even when empty
+            self._finish_file()
+            self._publish()
+        except BaseException:
+            self.abort()
+            raise
+        self._closed = True
+        return self.paths
+
+    def _publish(self):
+        manifest = _manifest_path(self.path)
+        if self.max_bytes:
+            shards = [p.name for p in self._staged]
+            _write_atomically(manifest, json.dumps({"shards": shards, "records": self.records}))
+            if self.path.exists():
+                self.path.unlink()
+            self.paths = list(self._staged)
+        else:
+            os.replace(self._staged[0], self.path)
+            if manifest.exists():
+                manifest.unlink()
+            self.paths = [self.path]
+        self._staged = []
+
+        # Shards from earlier runs, or orphaned by a crash, are no longer referenced
+        keep = {p.name for p in self.paths}
+        for shard in _shard_files(self.path):
+            if shard.name not in keep:
+                shard.unlink()
+
+    def abort(self):
+        if self._closed:
+            return
+        if self._handle is not None:
+            try:
+                self._handle.close()
+            except Exception:
+                pass
+        for path in self._staged + ([self._current] if self._current else []):
+            if path.exists():
+                path.unlink()
+        self._staged, self._batch = [], []
+        self._current, self._handle = None, None
+        self._closed = True
+
+
+def write_records(path: Path, records: Iterable[Dict[str, Any]], **kwargs) -> List[Path]:
+    """
+    Streams `records` to `path` (see RecordWriter) and returns the written files.
+    """
+    with RecordWriter(path, **kwargs) as writer:
+        writer.write_all(records)
+    return writer.paths
+
+
+def artifact_exists(path: Path) -> bool:
+    path = Path(path)
+    return _manifest_path(path).exists() or path.exists()
+
+
+def artifact_paths(path: Path) -> List[Path]:
+    """Resolves an artifact to the files that make it up, in order."""
+    path = Path(path)
+    manifest = _manifest_path(path)
+    if manifest.exists():
+        with manifest.open("r", encoding="utf-8") as f:
+            return [path.parent / name for name in json.load(f)["shards"]]
+    return [path] if path.exists() else []
+
+
+def read_records(path: Path) -> Iterator[Dict[str, Any]]:
+    """
+    Lazily yields records from an artifact written by RecordWriter, across shards.
+    """
+    if not artifact_exists(path):
+        raise FileNotFoundError(f"No artifact found at {path}")
+
+    for shard in artifact_paths(path):
+        if shard.name.endswith(".parquet"):
+            import pyarrow.parquet as pq
+
+            parquet_file = pq.ParquetFile(shard)
+            metadata = parquet_file.schema_arrow.metadata or {}
+            json_columns = json.loads(metadata.get(JSON_COLUMNS_KEY, b"[]"))
+            for batch in parquet_file.iter_batches(batch_size=PARQUET_BATCH_SIZE):
+                for row in batch.to_pylist():
+                    yield _decode_json_columns(row, json_columns)
+        else:
+            with _open_compressed(shard, "r") as f:
+                for line in f:
+                    if line.strip():
+                        yield json.loads(line)